@@ -1,19 +1,14 @@
-import sqlite3
-import pandas as pd
-from pathlib import Path
+from db import read_sql
 
 # --- CONFIGURATION ---
-# We point to the processed database, not the raw CSV
-DB_PATH = Path("data/processed/fulfillment.db")
+# We point to the processed database (db.DB_PATH), not the raw CSV
 
-def run_query(query, db_path=DB_PATH):
+def run_query(query):
     """
     Runs SQL queries and return a Pandas DataFrame
-    Handles the repeated process of connection and closing
+    Goes through db.read_sql, the single read path for the pipeline
     """
-    # 'with' statement to open/close automatically
-    with sqlite3.connect(db_path) as conn:
-        return pd.read_sql(query, conn)
+    return read_sql(query)
 
 def analyze_corruption():
     """
@@ -1,27 +1,78 @@
-import sqlite3
-from pathlib import Path
+from db import get_conn
+from setup_db import SQLITE_MAX_VARIABLES
+
+# --- CLEANING RULES ---
+# Assumption 1: negative weights are sign-entry errors
+#    (e.g. scanner glitch), not returns or calibration errors
+# Assumption 2: NULLs are invalid orders
+# Both clean() (in memory) and create_clean_table() (in SQL) apply these rules
 
 # --- CONFIGURATION ---
-DB_PATH = Path("data/processed/fulfillment.db")
+STAGING_TABLE = "clean_orders_staging" # save_clean_table writes here before the swap
+
+def clean(df):
+    """
+    Applies the cleaning rules to an in-memory DataFrame
+    Lets the pipeline skip the SQLite round-trip between stages
+    """
+    clean_df = df[df['num_items'].notna()]
+    clean_df = clean_df.assign(total_weight_kg=clean_df['total_weight_kg'].abs())
+    
+    print(f"Clean rows available: {len(clean_df)}")
+    print(f"Dropped {len(df) - len(clean_df)} rows due to missing data.")
+    
+    return clean_df.reset_index(drop=True)
+
+def drop_clean_orders(conn):
+    """
+    For idempotency (databases built by older runs hold clean_orders as a VIEW)
+    """
+    existing = conn.execute(
+        "SELECT type FROM sqlite_master WHERE name = 'clean_orders'"
+    ).fetchone()
+    if existing:
+        conn.execute(f"DROP {existing[0].upper()} clean_orders")
+
+def save_clean_table(clean_df):
+    """
+    Persists an already-cleaned DataFrame as the clean_orders table
+    Keeps the database in sync for the BI export and the standalone scripts
+    The rows are staged in a separate table first (to_sql commits on its own),
+    then swapped in with one transaction: a failure keeps the previous clean_orders
+    """
+    conn = get_conn()
+    
+    # 1. Stage the rows
+    conn.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+    clean_df.to_sql(
+        STAGING_TABLE, conn, index=False,
+        method='multi', chunksize=SQLITE_MAX_VARIABLES // len(clean_df.columns)
+    )
+    
+    # 2. Swap: drop, rename and index commit together or roll back together
+    with conn:
+        conn.execute("BEGIN")
+        drop_clean_orders(conn)
+        conn.execute(f"ALTER TABLE {STAGING_TABLE} RENAME TO clean_orders")
+        conn.execute("CREATE INDEX idx_clean_orders_id ON clean_orders(order_id)")
+    
+    print(f"Table 'clean_orders' saved ({len(clean_df)} rows).")
 
-def create_clean_view():
+def create_clean_table():
     """
-    Creates a SQL View that cleans the data
+    Materializes the cleaned data as a SQL table
+    Downstream readers scan the stored rows instead of re-running the cleaning logic
     """
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_conn()
     cursor = conn.cursor()
     print("Connecting to database...")
 
-    # For idempotency
-    cursor.execute("DROP VIEW IF EXISTS clean_orders")
+    drop_clean_orders(conn)
     
-    # 1. Define the Cleaning Logic (The View)
-    # Assumption 1: negative weights are sign-entry errors
-    #    (e.g. scanner glitch), not returns or calibration errors
-    # Assumption 2: NULLs are invalid orders   
-    create_view_sql = """
-    CREATE VIEW clean_orders AS
+    # 1. Define the Cleaning Logic (The Table)
+    create_table_sql = """
+    CREATE TABLE clean_orders AS
     SELECT 
         order_id,
         num_items,
@@ -33,20 +84,19 @@ def create_clean_view():
     WHERE num_items IS NOT NULL 
     """
     
-    # 2. Execute and Save
-    cursor.execute(create_view_sql)
+    # 2. Execute, Index and Save
+    cursor.execute(create_table_sql)
+    cursor.execute("CREATE INDEX idx_clean_orders_id ON clean_orders(order_id)")
     conn.commit() # Commits the schema change to the database file
     
-    print("View 'clean_orders' created successfully.")
+    print("Table 'clean_orders' created successfully.")
 
     # 3. Validation
-    # If the view works, should see fewer rows than the original 1000
+    # If the cleaning works, should see fewer rows than the original 1000
     count = cursor.execute("SELECT COUNT(*) FROM clean_orders").fetchone()[0]
     
     print(f"Clean rows available: {count}")
     print(f"Dropped {1000 - count} rows due to missing data.")
-    
-    conn.close()
 
 if __name__ == "__main__":
-    create_clean_view()
+    create_clean_table()
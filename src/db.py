@@ -0,0 +1,70 @@
+import sqlite3
+import pandas as pd
+from pathlib import Path
+
+# Optional dependency: connectorx decodes SQLite rows straight into columnar buffers
+try:
+    import connectorx as cx
+except ImportError:
+    cx = None
+
+# --- CONFIGURATION ---
+DB_PATH = Path("data/processed/fulfillment.db")
+RESULTS_PATH = DB_PATH.parent / "results.parquet" # Binary snapshot of the 'assignments' table
+
+# One connection shared by every stage running in this interpreter
+_conn = None
+
+def get_conn():
+    """
+    Returns the shared SQLite connection, opening it on first use
+    Keeps the page cache warm across stages instead of reconnecting per query
+    """
+    global _conn
+    if _conn is None:
+        # Ensure the processed directory exists
+        DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+        _conn = sqlite3.connect(DB_PATH)
+        # WAL + NORMAL sync: commits skip the full fsync, bulk loads are much faster
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.execute("PRAGMA cache_size=-65536") # Negative = KiB, i.e. 64 MB
+        _conn.execute("PRAGMA temp_store=MEMORY") # Sorts/temp tables never touch disk
+    return _conn
+
+def db_stamp():
+    """
+    Fingerprint of the database files (mtime + size of the DB and its WAL)
+    Changes whenever a write lands, including writes still sitting in the WAL
+    An empty WAL is ignored: merely opening a connection creates one (and
+    closing the last connection deletes it) without changing any data
+    """
+    parts = []
+    for path in (DB_PATH, DB_PATH.with_name(DB_PATH.name + "-wal")):
+        if path.exists():
+            stat = path.stat()
+            if stat.st_size > 0:
+                parts.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+    return "|".join(parts)
+
+def read_sql(query, conn=None):
+    """
+    Runs a SELECT and returns a Pandas DataFrame
+    An explicit conn is always used (pandas over it, so uncommitted writes on it are visible)
+    Without one: connectorx (rows decoded straight into Arrow buffers, no per-row
+    Python tuples) when installed, otherwise pandas over the shared connection
+    connectorx opens its own read connection, so it only sees committed data
+    """
+    if conn is None and cx is not None and DB_PATH.exists():
+        return cx.read_sql(f"sqlite://{DB_PATH.resolve()}", query)
+    return pd.read_sql_query(query, conn if conn is not None else get_conn())
+
+def close_conn():
+    """
+    Closes the shared connection (a later get_conn() opens a fresh one)
+    """
+    global _conn
+    if _conn is not None:
+        _conn.close()
+        _conn = None
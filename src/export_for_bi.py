@@ -1,38 +1,29 @@
-import sqlite3
-import pandas as pd
 import os
 import visualize_logistics
 
 # --- CONFIGURATION ---
-from setup_db import DB_PATH
 EXPORT_DIR = "data/bi_exports"
 OUTPUT_PATH = os.path.join(EXPORT_DIR, "fulfillment_bi_data.csv")
 
-def export_data():
+def export_data(results_df=None):
     """
     Exports clean CSVs for Power BI / Tableau
-    Joins the Orders and the Assignments to create a 'Master Table'
+    The Assignments already carry the order columns, so they form the 'Master Table'
+    Pass the in-memory results to skip re-reading them from SQL
     """
     print(f"--- Exporting Data to {EXPORT_DIR} ---")
     
     # 1. Ensure directory exists
     os.makedirs(EXPORT_DIR, exist_ok=True)
     
-    # 2. Load Data (Raw Orders)
-    conn = sqlite3.connect(DB_PATH)
-    orders_df = pd.read_sql_query("SELECT * FROM clean_orders", conn)
-    conn.close()
+    # 2. Load Optimization Results (only when not handed over in memory)
+    if results_df is None:
+        # Every row and column, at full precision, goes to BI (same as the in-memory path)
+        results_df = visualize_logistics.load_results(columns=None, downcast=False, filter_valid=False)
     
-    # 3. Load Optimization Results
-    results_df = visualize_logistics.load_results()
-    
-    # 4. Feature Engineering for BI
-    results_df['is_safety_violation'] = results_df.apply(
-        lambda row: 'Violation' if (row['assigned_worker'] == 'Robot' and row['total_weight_kg'] > 5) else 'Safe', 
-        axis=1
-    )
-    
-    # 5. Export to CSV
+    # 3. Export to CSV
+    # 'is_safety_violation' is already computed by optimize_logistics.save_results
+    # Written by pandas (not io_utils.write_csv) so the file format Power BI reads stays unchanged
     results_df.to_csv(OUTPUT_PATH, index=False)
 
     print(f"Success! Data exported to: {OUTPUT_PATH}")
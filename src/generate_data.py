@@ -2,10 +2,12 @@ import pandas as pd
 import numpy as np
 import os
 from pathlib import Path
+from io_utils import write_csv
 
 # --- CONFIGURATION ---
 # Set seed for reproducibilitiy
-np.random.seed(42) 
+SEED = 42
+rng = np.random.default_rng(SEED) # PCG64 generator, shared by every draw below
 
 # Magic Numbers
 NUM_ORDERS = 1000
@@ -26,25 +28,33 @@ def generate_orders(n=NUM_ORDERS):
     ids = np.arange(1, n + 1)
     
     # 2. Generate Items (Poisson)
-    items = np.random.poisson(lam=3, size=n)
-    items = np.clip(items, 1, None) # Clip to ensure no 0-item orders
+    # int32 halves the footprint; order item counts fit easily
+    items = rng.poisson(lam=3, size=n).astype(np.int32)
+    np.maximum(items, 1, out=items) # Clamp in place to ensure no 0-item orders
     
     # 3. Generate weight (Dependent on item count)
     # Logic: Total Weight = Num Items * Avg Item Weight
     # Treat 'Avg Item Weight' as a random variable (Normal Dist: Mean 2kg, Stdev 0.5kg)
-    avg_item_weights = np.random.normal(loc=2.0, scale=0.5, size=n)
+    # Standard normal drawn straight into the buffer, then scaled and shifted in place
+    avg_item_weights = np.empty(n, dtype=np.float64)
+    rng.standard_normal(out=avg_item_weights)
+    avg_item_weights *= 0.5
+    avg_item_weights += 2.0
     
     # Safety Clip: A single item cannot weigh negative kg. Minimum 0.1kg per item.
-    avg_item_weights = np.clip(avg_item_weights, 0.1, None)
+    # One-sided in-place max: no second array, no upper-bound branch
+    np.maximum(avg_item_weights, 0.1, out=avg_item_weights)
     
-    # Calculate Total Weight
-    weights = items * avg_item_weights
+    # Calculate Total Weight (in place on one float64 buffer)
+    weights = items.astype(np.float64)
+    weights *= avg_item_weights
+    np.round(weights, 2, out=weights)
     
     # 4. Build the DataFrame
     df = pd.DataFrame({
         'order_id': ids,
         'num_items': items,
-        'total_weight_kg': np.round(weights, 2)
+        'total_weight_kg': weights
     })
     
     return df
@@ -55,28 +65,45 @@ def corrupt_data(df, corruption_rate=PROB_DIRTY_DATA):
     1. NULL values in 'num_items' (simulating sensor miss)
     2. Negative values in 'total_weight_kg' (simulating calculation error)
     """
-    # Copy data 
-    dirty_df = df.copy()
-    
-    n_rows = len(dirty_df)
+    n_rows = len(df)
     n_corrupt = int(n_rows * corruption_rate)
     
     print(f"Injecting chaos into {n_corrupt} rows...")
     
-    # 1. Create NULLs
-    # Randomly pick 'n_corrupt' row indices
-    nan_indices = np.random.choice(dirty_df.index, size=n_corrupt, replace=False)
-    # Go to those rows, and the 'num_items' column, and set them to Not-A-Number (NaN)
-    dirty_df.loc[nan_indices, 'num_items'] = np.nan
+    # One shuffle serves both corruptions: the first slice gets NULLs,
+    # the next slice gets negatives (so the two sets never overlap)
+    perm = rng.permutation(n_rows)
+    nan_indices = perm[:n_corrupt]
+    if 2 * n_corrupt <= n_rows:
+        neg_indices = perm[n_corrupt:2 * n_corrupt]
+    else:
+        # Rate above 50%: two disjoint sets cannot fit, so draw the negatives
+        # independently (they may overlap the NULLs)
+        neg_indices = rng.choice(n_rows, size=n_corrupt, replace=False)
+    
+    # Work on copies of the raw NumPy columns, skipping pandas label lookups
+    # 1. Create NULLs: set 'num_items' to Not-A-Number (NaN), which needs a float column
+    items = df['num_items'].to_numpy(dtype=np.float64, copy=True)
+    items[nan_indices] = np.nan
+    
+    # 2. Create Negatives: multiply weight by -1 to flip the sign
+    weights = df['total_weight_kg'].to_numpy(copy=True)
+    weights[neg_indices] *= -1
     
-    # 2. Create Negatives
-    # Pick a DIFFERENT set of random rows
-    neg_indices = np.random.choice(dirty_df.index, size=n_corrupt, replace=False)
-    # Multiply weight by -1 to flip the sign
-    dirty_df.loc[neg_indices, 'total_weight_kg'] *= -1
+    dirty_df = df.assign(num_items=items, total_weight_kg=weights)
     
     return dirty_df
 
+def save_orders(df, output_dir=OUTPUT_PATH):
+    """
+    Writes the raw orders to CSV and returns the file path
+    """
+    save_path = output_dir / "orders.csv"
+    write_csv(df, save_path)
+    
+    print(f"SUCCESS: Generated dirty data at {save_path}")
+    return save_path
+
 if __name__ == "__main__":
     # 1. Generate clean data
     orders_df = generate_orders(NUM_ORDERS)
@@ -85,11 +112,7 @@ if __name__ == "__main__":
     dirty_orders = corrupt_data(orders_df)
     
     # 3. Save data
-    # Join paths
-    save_path = OUTPUT_PATH / "orders.csv"
-    dirty_orders.to_csv(save_path, index=False)
-    
-    print(f"SUCCESS: Generated dirty data at {save_path}")
+    save_orders(dirty_orders)
     
     # 4. Validation
     print("First 5 rows of generated data:")
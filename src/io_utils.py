@@ -0,0 +1,42 @@
+# Optional dependency: pyarrow's C++ writer is much faster than pandas' own,
+# and it is the Parquet engine
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
+
+def has_parquet():
+    """
+    True when Parquet can be read and written (pyarrow installed)
+    """
+    return pa is not None
+
+# --- CONFIGURATION ---
+CSV_BATCH_SIZE = 64 * 1024 # Rows serialized per batch (bounds writer memory)
+
+def write_csv(df, path):
+    """
+    Writes a DataFrame to CSV without the index
+    Uses pyarrow's native writer when installed, pandas otherwise
+    pyarrow quotes strings and the header and writes whole floats without '.0',
+    so this is for internal files only (the BI export keeps pandas' format)
+    """
+    if pa is None:
+        df.to_csv(path, index=False)
+        return
+    
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pacsv.write_csv(table, path, pacsv.WriteOptions(batch_size=CSV_BATCH_SIZE))
+
+def write_parquet(df, path):
+    """
+    Writes a DataFrame to Parquet without the index and returns True
+    Without pyarrow, removes any older snapshot at path (so it cannot go stale) and returns False
+    """
+    if pa is None:
+        path.unlink(missing_ok=True)
+        return False
+    
+    df.to_parquet(path, index=False)
+    return True
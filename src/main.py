@@ -1,8 +1,11 @@
 import logging
 import sys
-import subprocess
-import pandas as pd
 
+import db
+import generate_data
+import setup_db
+import analyze_corruption
+import clean_data
 import optimize_logistics
 import visualize_logistics
 import export_for_bi
@@ -19,17 +22,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger()
 
-def run_script(script_name):
+def run_stage(stage_name, func, *args):
     """
-    Helper function to run standalone scripts using the terminal command 'python script_name'
+    Helper function to run one pipeline stage in-process and return its result
+    Any failure is logged with its traceback and stops the pipeline
     """
-    logger.info(f"Running Script: {script_name}...")
+    logger.info(f"Running Stage: {stage_name}...")
     try:
-        # This runs the command "python src/script_name.py"
-        subprocess.run([sys.executable, f"src/{script_name}.py"], check=True)
-        logger.info(f"{script_name} completed successfully.")
-    except subprocess.CalledProcessError as e:
-        logger.error(f"{script_name} FAILED. Stopping pipeline.")
+        result = func(*args)
+        logger.info(f"{stage_name} completed successfully.")
+        return result
+    except Exception:
+        logger.exception(f"{stage_name} FAILED. Stopping pipeline.")
         sys.exit(1) # Stop the program immediately
 
 def main():
@@ -38,30 +42,35 @@ def main():
     logger.info("==========================================")
 
     # --- PHASE 1: INFRASTRUCTURE & INPUT ---
-    # We use run_script for these because they are likely standalone scripts
-    # that perform actions (create tables, insert data) rather than returning values.
+    # Every stage runs in this interpreter, so DataFrames are handed from
+    # stage to stage in memory. SQLite is only written for the SQL audit,
+    # the BI export and the standalone scripts; it is never read back here.
     
-    run_script("generate_data") 
-    run_script("setup_db")
-    run_script("analyze_corruption")
+    orders_df = run_stage("generate_data", generate_data.generate_orders)
+    dirty_df = run_stage("corrupt_data", generate_data.corrupt_data, orders_df)
+    run_stage("save_orders", generate_data.save_orders, dirty_df)
+    run_stage("setup_db", setup_db.init_db, dirty_df)
+    run_stage("analyze_corruption", analyze_corruption.analyze_corruption)
 
     # --- PHASE 2: PROCESSING (ETL & OPTIMIZATION) ---
     
-    run_script("clean_data") # Creates the clean_orders view
+    clean_df = run_stage("clean_data", clean_data.clean, dirty_df)
+    run_stage("save_clean_table", clean_data.save_clean_table, clean_df) # Persists the clean_orders table
     
-    # For Optimization, we use the nice modular functions we built!
     logger.info("Starting Optimization Engine...")
     
-    # 1. Load Data
-    conn = visualize_logistics.sqlite3.connect(visualize_logistics.DB_PATH)
-    clean_df = pd.read_sql_query("SELECT * FROM clean_orders", conn)
-    conn.close()
+    # 1. Load Data (already in memory)
     
     # 2. Run Solver
-    prob, choices, orders, workers = optimize_logistics.solve_model(clean_df)
+    status, assignment, orders, workers = run_stage("optimize", optimize_logistics.optimize, clean_df)
+    if assignment is None:
+        logger.error(f"Solver returned status '{status}'. Stopping pipeline.")
+        sys.exit(1)
+    if status != "Optimal":
+        logger.warning(f"Solver returned status '{status}': the assignment is feasible but not proven optimal.")
     
     # 3. Save Results (The Persistence)
-    optimize_logistics.save_results(clean_df, choices, workers)
+    results_df = run_stage("save_results", optimize_logistics.save_results, clean_df, assignment, workers)
     logger.info("✅ Optimization complete.")
 
     # --- PHASE 3: OUTPUT (VISUALIZATION & BI) ---
@@ -69,11 +78,12 @@ def main():
     logger.info("Generating Reports...")
     
     # Generate Dashboard
-    results_df = visualize_logistics.load_results()
-    visualize_logistics.save_dashboard(clean_df, results_df)
+    run_stage("save_dashboard", visualize_logistics.save_dashboard, clean_df, results_df)
     
     # Export for BI
-    export_for_bi.export_data()
+    run_stage("export_for_bi", export_for_bi.export_data, results_df)
+
+    db.close_conn()
     
     logger.info("==========================================")
     logger.info("         PIPELINE FINISHED SUCCESS        ")
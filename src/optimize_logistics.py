@@ -1,8 +1,9 @@
-import sqlite3
+import os
+import numpy as np
 import pandas as pd
 import pulp
-from pathlib import Path
-from setup_db import DB_PATH
+from db import RESULTS_PATH, get_conn, read_sql
+from io_utils import write_parquet
 
 # --- CONFIGURATION ---
 # Time Horizon: 1 Day (8 Hour Shift)
@@ -34,13 +35,32 @@ WORKERS = {
     }
 }
 
+# Safety audit: the hypothetical robot safe limit (kg)
+ROBOT_WEIGHT_LIMIT = 5
+
+# Solver: "lp" builds and solves the PuLP model (optimal), "greedy" uses the fast heuristic dispatch
+# The "lp" backend is HiGHS when highspy is installed, CBC otherwise (see get_lp_solver)
+SOLVER = "lp"
+
+# greedy_assign, JIT-compiled on first use (see get_greedy_kernel)
+_greedy_kernel = None
+
+def get_lp_solver():
+    """
+    Picks the LP backend: HiGHS (in-process via highspy, no LP file, no subprocess)
+    when installed, otherwise PuLP's bundled CBC
+    """
+    highs = pulp.HiGHS(msg=False, threads=os.cpu_count())
+    if highs.available():
+        return highs
+    return pulp.PULP_CBC_CMD(msg=0)
+
 def get_order_data():
     """
     Fetches the clean orders and calculates the total workload.
     """
-    with sqlite3.connect(DB_PATH) as conn:
-        # Read from the view
-        df = pd.read_sql("SELECT * FROM clean_orders", conn)
+    # Read from the cleaned table
+    df = read_sql("SELECT * FROM clean_orders")
     
     total_orders = len(df)
     total_items = df['num_items'].sum()
@@ -53,38 +73,47 @@ def get_order_data():
 def solve_model(df):
     """
     Constructs the LP problem, adds constraints, and calculates the optimal solution
-    Returns the raw PuLP objects needed to extract the answer
+    Orders with the same item count are interchangeable, so the model is solved
+    over item-count groups and the answer is fanned back out to the orders
+    Returns the solver status and the assigned worker index of every order
     """
     print("\n--- OPTIMIZING ---")
     # 1. Initialize model: Use LpMinimize
     prob = pulp.LpProblem("Fulfillment_Cost_Minimization", pulp.LpMinimize)
     
-    # 2. Create decision variables: Use classmethod .dicts() to create decision variables in 2 dimension
+    # 2. Aggregate identical orders: one group per distinct item count
     order_ids = df['order_id'].tolist()
     worker_names = list(WORKERS.keys())
-    choices = pulp.LpVariable.dicts("Assign", (order_ids, worker_names), 0, 1, cat=pulp.LpBinary)
+    groups = df.groupby('num_items').size()
+    group_items = groups.index.to_numpy(dtype=np.int64)
+    group_sizes = groups.to_numpy()
 
-    print(f"Created {len(order_ids) * len(worker_names)} decision variables.")
+    # Decision variables: how many orders of each group go to each worker
+    assign = {
+        iv: {
+            w: pulp.LpVariable(f"Assign_{iv}_{w}", lowBound=0, upBound=int(size), cat=pulp.LpInteger)
+            for w in worker_names
+        }
+        for iv, size in zip(group_items, group_sizes)
+    }
+
+    print(f"Created {len(group_items) * len(worker_names)} decision variables "
+          f"({len(order_ids)} orders in {len(group_items)} groups).")
     
     # 3. Define the objective variable: Cost = (Num Items / Speed) * Wage
-    costs = []
-    # Nested loop to calculate costs for each combination of order x worker
-    for i, row in df.iterrows():
-        oid = row['order_id']
-        items = row['num_items']
-        
-        for worker in worker_names:
-            # Time = Items / Speed
-            speed = WORKERS[worker]["speed"]
-            wage  = WORKERS[worker]["wage"]
-            hours_needed = items / speed
-            cost_to_pack = hours_needed * wage
-
-            variable = choices[oid][worker]
-            costs.append(cost_to_pack * variable)
-    
-    # Objective Variable
-    total_costs = pulp.lpSum(costs)
+    # Build the (groups x workers) hours and cost matrices in one vectorized pass
+    speeds = np.array([WORKERS[w]["speed"] for w in worker_names], dtype=np.float64)
+    wages  = np.array([WORKERS[w]["wage"] for w in worker_names], dtype=np.float64)
+    hours = group_items[:, None] / speeds[None, :]   # Time = Items / Speed
+    cost_mat = hours * wages[None, :]
+
+    # Objective Variable: built in one shot from (variable, coefficient) pairs,
+    # skipping lpSum's term-by-term expression merging
+    total_costs = pulp.LpAffineExpression([
+        (assign[iv][worker], float(cost_mat[k, j]))
+        for k, iv in enumerate(group_items)
+        for j, worker in enumerate(worker_names)
+    ])
             
     # Add the objective variable to the problem
     prob += total_costs
@@ -93,94 +122,166 @@ def solve_model(df):
 
     # 4. Add Constraints
     
-    # Constraint 1: Every order must be assigned to ONE worker
-    for oid in order_ids:
-        worker_switches = [choices[oid][w] for w in worker_names]
+    # Constraint 1: Every order of a group must be assigned to ONE worker
+    for iv, size in zip(group_items, group_sizes):
+        group_split = pulp.LpAffineExpression([(assign[iv][w], 1) for w in worker_names])
 
-        # Number of workers of each order = sum of worker switches
-        prob += pulp.lpSum(worker_switches) == 1, f"Single_Ownership_Order{oid}"     
+        # Orders handed out across workers = orders in the group
+        prob += group_split == int(size), f"Single_Ownership_Items{iv}"
     print("Constraint added: Each order assigned to exactly one worker.")
     
     # Constraint 2: Daily Capacity Limits
-    for worker in worker_names:
+    for j, worker in enumerate(worker_names):
         limit = WORKERS[worker]["max_hours"]
-        speed = WORKERS[worker]["speed"]
-        
-        # Calculate total hours assigned to current worker
-        worked_hours = []   # List of worked hours by worker
-        for i, row in df.iterrows():
-            oid = row['order_id']
-            items = row['num_items']
-            variable = choices[oid][worker]
-            worked_hours.append((items / speed) * variable)
         
-        total_worked_hours = pulp.lpSum(worked_hours)
+        # Total hours assigned to current worker (reuses the precomputed hours column)
+        total_worked_hours = pulp.LpAffineExpression([
+            (assign[iv][worker], float(hours[k, j])) for k, iv in enumerate(group_items)
+        ])
         prob += total_worked_hours <= limit, f"Max_Capacity_{worker}"
     print("Constraint added: Shift capacity limits active.")
 
     # 5. Solve
-    prob.solve(pulp.PULP_CBC_CMD(msg=0))
+    solver = get_lp_solver()
+    print(f"Solver: {solver.name}")
+    prob.solve(solver)
     
     # Results
     # "Optimal" means it found the absolute best solution
     # "Infeasible" means the problem is impossible
-    print(f"Status: {pulp.LpStatus[prob.status]}")
+    status = pulp.LpStatus[prob.status]
+    print(f"Status: {status}")
+
+    # 6. Disaggregate: hand the group counts back out to concrete orders
+    assignment = None
+    if prob.status == pulp.LpStatusOptimal:
+        counts = np.array([[assign[iv][w].varValue for w in worker_names] for iv in group_items])
+        assignment = fan_out(df, np.rint(counts).astype(np.int64))
     
-    return prob, choices, order_ids, worker_names
+    return status, assignment, order_ids, worker_names
+
+def solve_greedy(df):
+    """
+    Heuristic dispatch: cost per item (wage / speed) is constant per worker,
+    so orders go to the cheapest worker with room left, largest orders first
+    Orders are indivisible, so this is a knapsack and capacity can be stranded:
+    the result is feasible but not guaranteed optimal (status "Feasible")
+    Returns the same (status, assignment, order_ids, worker_names) tuple as solve_model
+    """
+    print("\n--- OPTIMIZING (GREEDY) ---")
+    order_ids = df['order_id'].tolist()
+    worker_names = list(WORKERS.keys())
+
+    # Rank workers by cost per item and convert shift hours into item capacity
+    cost_per_item = np.array([WORKERS[w]["wage"] / WORKERS[w]["speed"] for w in worker_names])
+    capacity = np.array([WORKERS[w]["max_hours"] * WORKERS[w]["speed"] for w in worker_names], dtype=np.float64)
+    worker_rank = np.argsort(cost_per_item, kind="stable")
+
+    items = df['num_items'].to_numpy(dtype=np.float64)
+    assignment = get_greedy_kernel()(items, np.argsort(-items, kind="stable"), capacity, worker_rank)
+
+    status = "Feasible" if (assignment >= 0).all() else "Infeasible"
+    print(f"Status: {status}")
+
+    return status, (assignment if status == "Feasible" else None), order_ids, worker_names
 
-def save_results(df, choices, workers):
+def get_greedy_kernel():
+    """
+    Returns greedy_assign compiled by numba, or the plain Python function when
+    numba is not installed (optional dependency)
+    numba is imported on the first greedy solve, so the "lp" path never loads it
+    """
+    global _greedy_kernel
+    if _greedy_kernel is None:
+        try:
+            from numba import njit
+            _greedy_kernel = njit(cache=True)(greedy_assign)
+        except ImportError:
+            _greedy_kernel = greedy_assign
+    return _greedy_kernel
+
+def greedy_assign(items, order, capacity, worker_rank):
+    """
+    Walks orders in the given order (largest first), giving each to the
+    cheapest worker with room left; -1 marks an order nobody can take
+    Called through get_greedy_kernel (JIT-compiled when numba is installed)
+    """
+    remaining = capacity.copy()
+    assignment = np.full(items.shape[0], -1, dtype=np.int64)
+    for i in order:
+        for j in worker_rank:
+            if remaining[j] >= items[i]:
+                remaining[j] -= items[i]
+                assignment[i] = j
+                break
+    return assignment
+
+def optimize(df):
+    """
+    Runs the solver selected by SOLVER
+    """
+    if SOLVER == "greedy":
+        return solve_greedy(df)
+    return solve_model(df)
+
+def fan_out(df, counts):
+    """
+    Turns per-group worker counts (groups sorted by item count) into
+    the assigned worker index of every order, aligned with the rows of df
+    """
+    n_groups, n_workers = counts.shape
+
+    # Sorting by item count makes every group a contiguous block, in groupby order
+    order = np.argsort(df['num_items'].to_numpy(), kind="stable")
+    worker_seq = np.repeat(np.tile(np.arange(n_workers), n_groups), counts.ravel())
+
+    assignment = np.empty(len(df), dtype=np.int64)
+    assignment[order] = worker_seq
+    return assignment
+
+def save_results(df, assignment, workers):
     """
     Extracts the solution, saves it to SQL ('assignments' table)
     Returns a clean DataFrame
     """
     print("\n--- RESULTS ---")
-    results = []
     
-    # Loop through every order
-    for i, row in df.iterrows():
-        oid = row['order_id']
-        
-        # Check which worker was assigned
-        assigned_worker = None
-        for worker in workers:
-            if choices[oid][worker].varValue > 0.5:
-                assigned_worker = worker
-                break
-        
-        # Calculate the final stats for this assignment
-        items = row['num_items']
-        speed = WORKERS[assigned_worker]["speed"]
-        wage  = WORKERS[assigned_worker]["wage"]
-        cost  = (items / speed) * wage
-
-        results.append({
-            "order_id": oid,
-            "assigned_worker": assigned_worker,
-            "cost": cost,
-            "num_items": row['num_items'],
-            "total_weight_kg": row['total_weight_kg']
-        })
-
-    # Convert to DataFrame
-    results_df = pd.DataFrame(results)
+    # Look up each order's worker stats by index, all orders at once
+    speeds = np.array([WORKERS[w]["speed"] for w in workers], dtype=np.float64)[assignment]
+    wages  = np.array([WORKERS[w]["wage"] for w in workers], dtype=np.float64)[assignment]
+    items  = df['num_items'].to_numpy()
+    weights = df['total_weight_kg'].to_numpy()
+    assigned = np.array(workers)[assignment]
+
+    # Flag safety violations while the assignment arrays are in memory
+    is_violation = (assigned == "Robot") & (weights > ROBOT_WEIGHT_LIMIT)
+
+    # Build the results column-at-a-time
+    results_df = pd.DataFrame({
+        "order_id": df['order_id'].to_numpy(),
+        "assigned_worker": assigned,
+        "cost": (items / speeds) * wages,
+        "num_items": items,
+        "total_weight_kg": weights,
+        "is_safety_violation": np.where(is_violation, "Violation", "Safe")
+    })
     
     # Print the summary
     print("Workforce Distribution:")
     print(results_df['assigned_worker'].value_counts())
     print(f"\nTotal Cost of Operation: ${results_df['cost'].sum():,.2f}")
     
-    # Save to SQL
-    conn = sqlite3.connect(DB_PATH)
-    results_df.to_sql("assignments", conn, if_exists="replace", index=False)
-    conn.close()
+    # Save to SQL (source of truth) and to Parquet (fast, typed hand-off to the report scripts)
+    results_df.to_sql("assignments", get_conn(), if_exists="replace", index=False)
+    write_parquet(results_df, RESULTS_PATH)
 
     return results_df
     
 if __name__ == "__main__":
     orders_df = get_order_data()
-    prob, choices, orders, workers = solve_model(orders_df)
+    status, assignment, orders, workers = optimize(orders_df)
     
-    # Only save results when solution exists
-    if pulp.LpStatus[prob.status] == "Optimal":
-        results_df = save_results(orders_df, choices, workers)
+    # Only save results when solution exists (optimal or heuristic)
+    if assignment is not None:
+        results_df = save_results(orders_df, assignment, workers)
     
\ No newline at end of file
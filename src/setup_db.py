@@ -1,34 +1,41 @@
-import sqlite3
 import pandas as pd
 from pathlib import Path
+from db import DB_PATH, get_conn
 
 # --- CONFIGURATION ---
-# Define data paths
+# Define data paths (the database location lives in db.py)
 DATA_DIR = Path("data")
 CSV_PATH = DATA_DIR / "raw" / "orders.csv"
-DB_PATH = DATA_DIR / "processed" / "fulfillment.db"
 
-# Ensure the processed directory exists
-DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+# SQLite's default cap on bound parameters per statement (older builds)
+SQLITE_MAX_VARIABLES = 999
 
-def init_db():
+def init_db(df=None):
     """
     Initializes the SQLite database and loads the raw data
+    Pass an in-memory DataFrame to skip re-reading the CSV
     """
     print(f"Connecting to database at {DB_PATH}...")
 
-    # 1. Connect to the database
-    conn = sqlite3.connect(DB_PATH)
+    # 1. Connect to the database (shared connection)
+    conn = get_conn()
     cursor = conn.cursor()
 
-    # 2. Read the CSV
-    print("Loading raw CSV data...")
-    df = pd.read_csv(CSV_PATH)
+    # 2. Read the CSV (only when the orders were not handed over in memory)
+    if df is None:
+        print("Loading raw CSV data...")
+        df = pd.read_csv(CSV_PATH)
 
     # 3. Write to SQL
     # if_exists='replace': Drops the table if it exists and creates a new one.
     # index=False: Don't save the Pandas row numbers as a column.
-    df.to_sql('orders', conn, if_exists='replace', index=False)
+    # method='multi': One multi-row INSERT per chunk instead of one INSERT per row,
+    #   chunks sized so (rows x columns) stays under SQLite's parameter limit.
+    # to_sql commits the table replacement and the inserts itself.
+    df.to_sql(
+        'orders', conn, if_exists='replace', index=False,
+        method='multi', chunksize=SQLITE_MAX_VARIABLES // len(df.columns)
+    )
     
     print(f"SUCCESS: Loaded {len(df)} rows into table 'orders'.")
 
@@ -40,8 +47,6 @@ def init_db():
     print("Sample Data from SQL:")
     sample = pd.read_sql("SELECT * FROM orders LIMIT 5", conn)
     print(sample)
-    
-    conn.close()
 
 if __name__ == "__main__":
     init_db()
\ No newline at end of file